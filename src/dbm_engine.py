@@ -1,24 +1,33 @@
 """Module to store hashed user strings in database"""
 
-import base64
 import datetime
 import dbm
+import hmac
 import json
 import logging
 import os
+import secrets
+import threading
 import uuid
 from typing import (
     Dict,
     Union,
     Optional
 )
+from functools import lru_cache
 from logging.handlers import RotatingFileHandler
 import argon2
-import shortuuid
+import lmdb
 from argon2 import PasswordHasher
 from dotenv import load_dotenv
 
-from settings import get_log_path, get_path
+from settings import (
+    argon2_memory_cost,
+    argon2_parallelism,
+    argon2_time_cost,
+    get_log_path,
+    get_path
+)
 
 load_dotenv()
 
@@ -46,6 +55,93 @@ handler.setFormatter(formatter)
 logger.addHandler(handler)
 
 
+@lru_cache(maxsize=16384)
+def _file_name_for(uid: str) -> str:
+    """Return the store name for a user id"""
+    return f"user_db_{uid}"
+
+
+@lru_cache(maxsize=16384)
+def _path_for(base: str, uid: str) -> str:
+    """Return the store path for a user id under the base directory"""
+    return os.path.join(base, _file_name_for(uid))
+
+
+# Shared hasher, verify() reads the cost parameters from the stored hash
+_PH = PasswordHasher(
+    time_cost=argon2_time_cost,
+    memory_cost=argon2_memory_cost,
+    parallelism=argon2_parallelism,
+    hash_len=32,
+    salt_len=16
+)
+
+# Per-user store size; the four short records fit many times over
+_STORE_MAP_SIZE = 1 << 20
+
+
+# Keys of a user store, the same set written before the LMDB switch
+_STORE_KEYS = ('_id', 'hash_string', 'secured_user_string', 'created_on')
+
+# Files the dbm backends keep next to (or instead of) the store path
+_LEGACY_SUFFIXES = ('.dat', '.dir', '.bak', '.db', '.pag')
+# Held while a legacy store is checked and converted, so only one thread migrates it
+_migrate_lock = threading.Lock()
+
+
+@lru_cache(maxsize=16384)
+def _migrate_legacy_store(file_path: str) -> None:
+    """Convert a store written by the dbm engine into LMDB, once per path.
+
+    Raises:
+        lmdb.Error: If the legacy store cannot be read
+    """
+    with _migrate_lock:
+        # Checked under the lock, a thread that waited finds the store converted
+        if not dbm.whichdb(file_path):
+            return
+        try:
+            with dbm.open(file_path, 'r') as legacy_store:
+                records = {key: legacy_store.get(key, b'') for key in _STORE_KEYS}
+        except dbm.error as e:
+            raise lmdb.Error(f"{file_path}: legacy dbm store could not be migrated: {str(e)}")
+
+        migrating_path = f"{file_path}.migrating"
+        with lmdb.open(migrating_path, map_size=_STORE_MAP_SIZE, subdir=False) as env, \
+                env.begin(write=True) as individual_store:
+            for key, value in records.items():
+                individual_store.put(key.encode('utf-8'), value)
+        for legacy_path in [f"{file_path}{suffix}" for suffix in _LEGACY_SUFFIXES] + [f"{migrating_path}-lock"]:
+            try:
+                os.remove(legacy_path)
+            except FileNotFoundError:
+                pass
+        os.replace(migrating_path, file_path)
+    logger.info(f"[MIGRATE] Converted legacy dbm store {file_path} to LMDB.")
+
+
+def _open_store(file_path: str, readonly: bool = False, create: bool = True) -> lmdb.Environment:
+    """Open a single-file LMDB user store, migrating a legacy dbm store first.
+
+    Raises:
+        lmdb.Error: If the store does not exist and may not be created,
+        or is a legacy store that cannot be migrated
+    """
+    _migrate_legacy_store(file_path)
+    if readonly:
+        return lmdb.open(file_path, subdir=False, readonly=True, lock=False, readahead=False)
+    # With subdir=False, lmdb's own `create` flag only covers the parent directory
+    if not create and not os.path.exists(file_path):
+        raise lmdb.Error(f"{file_path}: No such file or directory")
+    return lmdb.open(
+        file_path,
+        map_size=_STORE_MAP_SIZE,
+        subdir=False,
+        sync=False,
+        writemap=True
+    )
+
+
 class UserDBManager:
     """Main DB Manager for IRs.
 
@@ -62,8 +158,8 @@ class UserDBManager:
         with a unique identifier attached to file name."""
         self.__get_path = os.path.expanduser(get_path) if get_path else ''
         self.__unique_identifier = uid if uid else str(uuid.uuid4()) #Except for storing strings, always pass in the uid
-        self.__file_name = f"user_db_{self.__unique_identifier}"
-        self.__file_path = os.path.join(self.__get_path, self.__file_name)
+        self.__file_name = _file_name_for(self.__unique_identifier)
+        self.__file_path = _path_for(self.__get_path, self.__unique_identifier)
         
         if self.db_file_exists():
             logger.info(f"[INIT] UserDBManager instance already exists for {self.get_file_name}, skipping initialisation.")
@@ -95,19 +191,16 @@ class UserDBManager:
             
         os.makedirs(self.__get_path, exist_ok=True)
 
-        with open(self.__file_path, 'w', encoding="utf-8"):
-            pass
-
         self.__initialize_user_db()
         logger.info("UserDBManager instance initialised.")
 
     def __initialize_user_db(self) -> None:
         """Initialize the keys in the user-specific database"""
-        with dbm.open(self.__file_path, 'n') as individual_store:
-            individual_store['_id'] = b''
-            individual_store['hash_string'] = b''
-            individual_store['secured_user_string'] = b''
-            individual_store['created_on'] = b''
+        with _open_store(self.__file_path) as env, env.begin(write=True) as individual_store:
+            individual_store.put(b'_id', b'')
+            individual_store.put(b'hash_string', b'')
+            individual_store.put(b'secured_user_string', b'')
+            individual_store.put(b'created_on', b'')
 
     def serialize_data(
             self,
@@ -134,18 +227,20 @@ class UserDBManager:
         Returns:
             Optional[Union[str, bytes]]: The data associated with the key, or None
         """
-        file_name = f"user_db_{uid}"
-        file_path = os.path.join(self.__get_path, file_name)
-        if os.path.exists(file_path):
-            with dbm.open(file_path, 'r') as individual_store:
-                user_data_bytes = individual_store.get(key.encode('utf-8'))
-                if user_data_bytes is not None:
-                    logger.info(f"[FETCH] Data fetched from file: {file_name} ")
-                    return user_data_bytes.decode('utf-8')
-                logger.warning(f'[FETCH] Associated key not found in file: {file_name}')
-                return f"Associated key not found"
-        logger.error("[FETCH] System Error while key lookup")
-        return f'System Error while fetching'
+        file_name = _file_name_for(uid)
+        file_path = _path_for(self.__get_path, uid)
+        try:
+            env = _open_store(file_path, readonly=True)
+        except lmdb.Error:
+            logger.error("[FETCH] System Error while key lookup")
+            return f'System Error while fetching'
+        with env, env.begin() as individual_store:
+            user_data_bytes = individual_store.get(key.encode('utf-8'))
+        if user_data_bytes is not None:
+            logger.info(f"[FETCH] Data fetched from file: {file_name} ")
+            return user_data_bytes.decode('utf-8')
+        logger.warning(f'[FETCH] Associated key not found in file: {file_name}')
+        return f"Associated key not found"
 
     def deserialize_data(self, uid: str, key: str) -> Optional[Union[str, bytes]]:
         """Fetch and deserialize user data from the database using a specific key.
@@ -171,16 +266,14 @@ class UserDBManager:
             str: The hashed user string.
         """
         user_string_bytes = user_string.encode('utf-8')
-        passwd_hash = PasswordHasher()
-        hashed_user_string = passwd_hash.hash(user_string_bytes)
+        hashed_user_string = _PH.hash(user_string_bytes)
         return hashed_user_string
 
     def generate_secured_string(self) -> str:
         """Method to generate secured user string 
-        using the global uuid and shortuuid module
+        from 128 random bits, url-safe base64 encoded
         """
-        unique_id = uuid.uuid4()
-        secure_user_string = shortuuid.encode(unique_id)
+        secure_user_string = secrets.token_urlsafe(16)
         return secure_user_string
 
 
@@ -194,32 +287,28 @@ class UserDBManager:
         Returns:
             Optional[Dict[str, str]]: A dictionary containing the user ID if successful, None otherwise.
         """
-        # Validate input
-        if not all(req.values()):
+        # Validate input, bail out before the memory-hard hash
+        request_string = req.get('request_string')
+        if not request_string:
             logger.error("[STORAGE] Empty request received")
             return None
 
-        serialised_data = self.serialize_data(req)
-        user_hash = self.hash_user_string(serialised_data)
+        user_hash = self.hash_user_string(json.dumps(request_string))
+        current_datetime = datetime.datetime.now().isoformat()
+        secured_user_string = self.generate_secured_string()
 
-        with dbm.open(self.__file_path, 'c') as individual_store:
-            individual_store['hash_string'] = user_hash
-            
-            current_datetime = datetime.datetime.now().isoformat()
-            secured_user_string = self.generate_secured_string()
+        # One write transaction, committed together; sync=False leaves the flush to the OS
+        with _open_store(self.__file_path) as env, env.begin(write=True) as individual_store:
+            individual_store.put(b'hash_string', user_hash.encode('utf-8'))
+            individual_store.put(b'secured_user_string', secured_user_string.encode('utf-8'))
+            individual_store.put(b'_id', self.__unique_identifier.encode('utf-8'))
+            individual_store.put(b'created_on', current_datetime.encode('utf-8'))
 
-            individual_store['secured_user_string'] = secured_user_string
-            individual_store['_id'] = self.__unique_identifier
-            individual_store['created_on'] = current_datetime
-
-            user_id = individual_store.get('_id')
-            
-            if user_id:
-                logger.info("[STORAGE] UserID successfully assigned")
-                return {"id": user_id.decode('utf-8') }
-            else:
-                logger.error("[STORAGE] User ID is None. Unable to assign to uid")
-                return None
+        if self.__unique_identifier:
+            logger.info("[STORAGE] UserID successfully assigned")
+            return {"id": self.__unique_identifier}
+        logger.error("[STORAGE] User ID is None. Unable to assign to uid")
+        return None
 
     def verify_user(
             self,
@@ -230,7 +319,6 @@ class UserDBManager:
         Returns:
             Optional[str]: A success message or None if verification fails.
         """
-        passwd_hash = PasswordHasher()
         user_id = req.get('uid')
 
         if not user_id:
@@ -248,7 +336,7 @@ class UserDBManager:
                     return "User hash not found in the database."
 
                 try:
-                    check_validity = passwd_hash.verify(user_hash, user_string)
+                    check_validity = _PH.verify(user_hash, user_string)
                 except argon2.exceptions.VerifyMismatchError:
                     logger.error(f"[VERIF] User string does not match the stored hash for UID: {user_id}.")
                     return "User string does not match the stored hash."
@@ -278,22 +366,22 @@ class UserDBManager:
             or an error message if the database is not found.
         """
         view_database: Dict[str, str] = {}
-        file_name = f"user_db_{user_id}"
-        file_path = os.path.join(self.__get_path, file_name)
+        file_path = _path_for(self.__get_path, user_id)
         
-        if os.path.exists(file_path):
-            with dbm.open(file_path, 'r') as individual_store:
-                for key in individual_store.keys():
-                    try:
-                        view_database[key.decode('utf-8')] = individual_store[key].decode('utf-8')
-                    except UnicodeDecodeError:
-                        view_database[key.decode('utf-8')] = individual_store[key].hex()
-            
-            logger.info(f"[DISPLAY] Database contents retrieved for UID: {user_id}")
-            return view_database
-                
-        logger.error(f"[DISPLAY] No database found for UID: {user_id}")
-        return f"No database found for UID: {user_id}"
+        try:
+            env = _open_store(file_path, readonly=True)
+        except lmdb.Error:
+            logger.error(f"[DISPLAY] No database found for UID: {user_id}")
+            return f"No database found for UID: {user_id}"
+        with env, env.begin() as individual_store:
+            for key, value in individual_store.cursor():
+                try:
+                    view_database[key.decode('utf-8')] = value.decode('utf-8')
+                except UnicodeDecodeError:
+                    view_database[key.decode('utf-8')] = value.hex()
+
+        logger.info(f"[DISPLAY] Database contents retrieved for UID: {user_id}")
+        return view_database
 
     def check_sus_integrity(self, req: Dict[str, str]) -> str:
         """Check secured user strings integrity before restoring dbm
@@ -311,25 +399,28 @@ class UserDBManager:
             = req.get('uid'), req.get('secured_user_string')
         if not get_user_id and not get_secured_user_string :
             raise TypeError("Invalid key passed")
-        file_name = f"user_db_{get_user_id}"
-        file_path = os.path.join(self.__get_path, file_name)
-        if os.path.exists(file_path):
-            logger.info(f'[RESTORE] File for user: {get_user_id} exists.')
-            with dbm.open(file_path, 'r') as individual_store:
-                try:
-                    find_secure_user_string = individual_store.get(
-                        "secured_user_string")
-                    if find_secure_user_string is not None:
-                        check_string_integrity = \
-                            find_secure_user_string.decode('utf-8') \
-                            == get_secured_user_string
-                        if check_string_integrity:
-                            logger.info(f"[RESTORE] Integrity check passed for user:{get_user_id}")
-                            return "Success"
-                        logger.warning(f"[RESTORE] Integrity check failed for user:{get_user_id}")
-                        return "Error, Integrity check failed"
-                except KeyError:
-                    return "User string not found in the database."
+        file_path = _path_for(self.__get_path, get_user_id)
+        try:
+            env = _open_store(file_path, readonly=True)
+        except lmdb.Error:
+            logger.error(f"[RESTORE] DBM not found for user: {get_user_id}")
+            return f"DBM not found"
+        logger.info(f'[RESTORE] File for user: {get_user_id} exists.')
+        with env, env.begin() as individual_store:
+            try:
+                find_secure_user_string = individual_store.get(
+                    b"secured_user_string")
+                if find_secure_user_string is not None:
+                    check_string_integrity = hmac.compare_digest(
+                        find_secure_user_string,
+                        (get_secured_user_string or '').encode('utf-8'))
+                    if check_string_integrity:
+                        logger.info(f"[RESTORE] Integrity check passed for user:{get_user_id}")
+                        return "Success"
+                    logger.warning(f"[RESTORE] Integrity check failed for user:{get_user_id}")
+                    return "Error, Integrity check failed"
+            except KeyError:
+                return "User string not found in the database."
         logger.error(f"[RESTORE] DBM not found for user: {get_user_id}")
         return f"DBM not found"
 
@@ -350,31 +441,30 @@ class UserDBManager:
             logger.error("[RECOVER] Missing '_id' or 'user_string' in request")
             return None
 
-        file_name = f"user_db_{get_uid}"
-        file_path = os.path.join(self.__get_path, file_name)
+        file_path = _path_for(self.__get_path, get_uid)
         
-        if not os.path.exists(file_path):
+        try:
+            env = _open_store(file_path, create=False)
+        except lmdb.Error:
             logger.error(f"[RECOVER] DBM not found for user: {get_uid}")
             return None
 
         serialized_data = self.serialize_data({'request_string': user_string})
         user_hash = self.hash_user_string(serialized_data)
-
-        with dbm.open(file_path, 'c') as individual_store:
-            individual_store['hash_string'] = user_hash
-            
-            current_datetime = datetime.datetime.now().isoformat()
-            secured_user_string = self.generate_secured_string()
-
-            individual_store['secured_user_string'] = secured_user_string
-            individual_store['_id'] = get_uid
-            individual_store['created_on'] = current_datetime
-
-            logger.info(f"[RECOVER] Account recovered successfully for user: {get_uid}")
-            return {
-                "id": get_uid,
-                "sus": secured_user_string
-            }
+        current_datetime = datetime.datetime.now().isoformat()
+        secured_user_string = self.generate_secured_string()
+
+        with env, env.begin(write=True) as individual_store:
+            individual_store.put(b'hash_string', user_hash.encode('utf-8'))
+            individual_store.put(b'secured_user_string', secured_user_string.encode('utf-8'))
+            individual_store.put(b'_id', get_uid.encode('utf-8'))
+            individual_store.put(b'created_on', current_datetime.encode('utf-8'))
+
+        logger.info(f"[RECOVER] Account recovered successfully for user: {get_uid}")
+        return {
+            "id": get_uid,
+            "sus": secured_user_string
+        }
     
     
     def close_account(self, req: Dict[str, str]) -> str:
@@ -394,24 +484,29 @@ class UserDBManager:
         if not user_id or not secured_user_string:
             raise KeyError('Error parsing user input')
         
-        file_name = f"user_db_{user_id}"
-        file_path = os.path.join(self.__get_path, file_name)
+        file_path = _path_for(self.__get_path, user_id)
         
-        if not os.path.exists(file_path):
+        try:
+            env = _open_store(file_path, readonly=True)
+        except lmdb.Error:
             logger.error(f"[CLOSE ACCOUNT] DBM not found for user: {user_id}")
             return 'DBM not found'
 
         try:
-            with dbm.open(file_path, 'r') as individual_store:
-                db_secured = individual_store.get('secured_user_string')
+            with env, env.begin() as individual_store:
+                db_secured = individual_store.get(b'secured_user_string')
                 if db_secured is None:
                     logger.error(f"[CLOSE ACCOUNT] Account does not exist for UID: {user_id}")
                     return 'User not found'
-                if db_secured.decode('utf-8') != secured_user_string:
+                if not hmac.compare_digest(db_secured, secured_user_string.encode('utf-8')):
                     logger.warning(f"[CLOSE ACCOUNT] Provided Secured User String does not match for UID: {user_id}")
                     return 'Provided Secured User String does not match for UID'
             
             os.remove(file_path)
+            try:
+                os.remove(f"{file_path}-lock")
+            except FileNotFoundError:
+                pass
             if os.path.exists(file_path):
                 logger.error(f"[CLOSE ACCOUNT] Failed to delete DBM file for UID: {user_id}")
                 return 'Error: Failed to delete account'
@@ -12,6 +12,26 @@ db_file_name = 'user_db'
 get_path = os.getenv('GET_PATH')
 get_log_path = os.getenv('LOG_PATH')
 
+# ARGON2 COST PARAMETERS
+# Tune once for the production hardware; verify() reads them from each hash,
+# so changing them only affects newly stored strings
+argon2_time_cost = int(os.getenv('ARGON2_T', '3'))
+argon2_memory_cost = int(os.getenv('ARGON2_M_KIB', '65536'))
+argon2_parallelism = int(os.getenv('ARGON2_P', '4'))
+
+# S3 OBJECT CACHE
+s3_cache_ttl = int(os.getenv('S3_CACHE_TTL', '60'))
+s3_cache_fresh = float(os.getenv('S3_CACHE_FRESH', '5'))
+s3_missing_ttl = float(os.getenv('S3_MISSING_TTL', '5'))
+
+# S3 WRITE COALESCING
+# Off by default: with coalescing on, a store returns before its PUT lands
+s3_flush_interval_ms = int(os.getenv('S3_FLUSH_INTERVAL_MS', '0'))
+s3_flush_max = int(os.getenv('S3_FLUSH_MAX', '256'))
+
+# VERIFICATION CACHE
+verify_cache_ttl = int(os.getenv('VERIFY_CACHE_TTL', '300'))
+
 
 # REDIS CLOUD CONN
 
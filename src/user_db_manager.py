@@ -1,27 +1,58 @@
 """Module to store hashed user strings in database"""
 
-import base64
+import asyncio
+import atexit
 import datetime
 import dbm
+import hashlib
+import hmac
 import json
 import logging
+import multiprocessing
 import os
+import secrets
+import threading
+import time
 import uuid
+import weakref
 from typing import (
+    Any,
+    AsyncGenerator,
     Dict,
+    List,
+    Tuple,
     Union,
     Optional
 )
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
 from logging.handlers import RotatingFileHandler
+import aioboto3
 import argon2
-import shortuuid
+import msgpack
+import orjson
 from argon2 import PasswordHasher
 from dotenv import load_dotenv
 import boto3
 import io
+from botocore.config import Config
 from botocore.exceptions import ClientError
-
-from settings import get_log_path, get_path
+from cachetools import TTLCache
+
+from settings import (
+    argon2_memory_cost,
+    argon2_parallelism,
+    argon2_time_cost,
+    get_log_path,
+    get_path,
+    s3_cache_fresh,
+    s3_cache_ttl,
+    s3_flush_interval_ms,
+    s3_flush_max,
+    s3_missing_ttl,
+    verify_cache_ttl
+)
 
 load_dotenv()
 
@@ -34,6 +65,476 @@ logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
 
 
+@lru_cache(maxsize=16384)
+def _file_name_for(uid: str) -> str:
+    """Return the store name for a user id"""
+    return f"user_db_{uid}"
+
+
+@lru_cache(maxsize=16384)
+def _path_for(base: str, uid: str) -> str:
+    """Return the local store path for a user id under the base directory"""
+    return os.path.join(base, _file_name_for(uid))
+
+
+# Shared hasher, verify() reads the cost parameters from the stored hash
+_PH = PasswordHasher(
+    time_cost=argon2_time_cost,
+    memory_cost=argon2_memory_cost,
+    parallelism=argon2_parallelism,
+    hash_len=32,
+    salt_len=16
+)
+
+
+# Argon2 runs in C with the GIL released, so async callers offload it to threads
+_ARGON2_POOL = ThreadPoolExecutor(max_workers=os.cpu_count())
+
+# Batch verification fetches user objects concurrently, within the S3 pool size
+_FETCH_POOL = ThreadPoolExecutor(max_workers=32, thread_name_prefix='s3-fetch')
+
+# Batch verification runs Argon2 in worker processes, built on first use
+_VERIFY_PROCESS_POOL: Optional[ProcessPoolExecutor] = None
+_verify_process_pool_lock = threading.Lock()
+
+
+def _get_verify_process_pool() -> ProcessPoolExecutor:
+    """Return the shared verification process pool, creating it on first use"""
+    global _VERIFY_PROCESS_POOL
+    with _verify_process_pool_lock:
+        if _VERIFY_PROCESS_POOL is None:
+            # Not fork: a child could inherit locks held by boto3 or the flusher thread
+            _VERIFY_PROCESS_POOL = ProcessPoolExecutor(
+                max_workers=os.cpu_count(),
+                mp_context=multiprocessing.get_context('forkserver')
+            )
+    return _VERIFY_PROCESS_POOL
+
+
+def _discard_verify_process_pool(pool: ProcessPoolExecutor) -> None:
+    """Drop a pool broken by a dead worker so the next call builds a new one"""
+    global _VERIFY_PROCESS_POOL
+    with _verify_process_pool_lock:
+        if _VERIFY_PROCESS_POOL is pool:
+            _VERIFY_PROCESS_POOL = None
+    pool.shutdown(wait=False)
+
+
+def _verify_hash(user_hash: str, user_string: str) -> bool:
+    """Check a user string against its stored hash, here or in a worker process.
+
+    Returns:
+        bool: False if the string does not match the hash
+    """
+    try:
+        return _PH.verify(user_hash, user_string)
+    except argon2.exceptions.VerifyMismatchError:
+        return False
+
+# Per-process cache of user objects: file_name -> (etag, data, fresh_until).
+# Fresh entries skip S3 entirely, stale ones are revalidated by ETag.
+_s3_cache: TTLCache = TTLCache(maxsize=10_000, ttl=s3_cache_ttl)
+# Objects known not to exist, so repeated bad-UID lookups skip S3 for a while
+_s3_missing: TTLCache = TTLCache(maxsize=10_000, ttl=s3_missing_ttl)
+_s3_cache_lock = threading.Lock()
+# Write generations: every write, delete or eviction bumps the global counter
+# and stamps the key, so a GET that started before it never fills the cache.
+# Entries outlive any single GET by a wide margin.
+_s3_seq = 0
+_s3_last_write: TTLCache = TTLCache(maxsize=10_000, ttl=300)
+
+_S3_MISSING_CODES = ('NoSuchKey', '404')
+
+
+_S3_CONFIG = Config(max_pool_connections=64, retries={'max_attempts': 2})
+
+# boto3 clients are thread-safe once built, share one per process
+_S3: Any = None
+_s3_lock = threading.Lock()
+
+# aioboto3 clients are bound to the loop they were opened on, keep one per loop
+# as (lifetime generator, client)
+_AIO_SESSION = aioboto3.Session()
+_aio_s3_clients: 'weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Tuple[Any, Any]]' = weakref.WeakKeyDictionary()
+
+
+def _get_s3() -> Any:
+    """Return the shared S3 client, creating it on first use"""
+    global _S3
+    with _s3_lock:
+        if _S3 is None:
+            _S3 = boto3.client('s3', config=_S3_CONFIG)
+    return _S3
+
+
+async def _aio_s3_lifetime() -> AsyncGenerator[Any, None]:
+    """Hold an async S3 client open until its loop shuts down.
+
+    The loop tracks this generator, so `loop.shutdown_asyncgens()`, which
+    `asyncio.run` calls on exit, closes the client and its connections.
+    """
+    async with _AIO_SESSION.client('s3', config=_S3_CONFIG) as client:
+        try:
+            yield client
+        finally:
+            loop = asyncio.get_running_loop()
+            if _aio_s3_clients.get(loop, (None, None))[1] is client:
+                del _aio_s3_clients[loop]
+
+
+async def _get_aio_s3() -> Any:
+    """Return the async S3 client of the running loop, opening it on first use"""
+    loop = asyncio.get_running_loop()
+    opened = _aio_s3_clients.get(loop)
+    if opened is None:
+        lifetime = _aio_s3_lifetime()
+        client = await lifetime.__anext__()
+        if loop in _aio_s3_clients:
+            # Another coroutine on this loop opened one while we awaited
+            await lifetime.aclose()
+            return _aio_s3_clients[loop][1]
+        opened = _aio_s3_clients[loop] = (lifetime, client)
+    return opened[1]
+
+
+# Stored objects are msgpack prefixed with a format version byte.
+# Objects written before the switch are plain JSON and start with '{'.
+_PAYLOAD_MSGPACK_V1 = b'\x01'
+_PAYLOAD_CONTENT_TYPE = 'application/msgpack'
+
+
+def _encode_payload(data: Dict[str, str]) -> bytes:
+    """Serialize a user object for storage in S3"""
+    return _PAYLOAD_MSGPACK_V1 + msgpack.packb(data, use_bin_type=True)
+
+
+def _decode_payload(body: bytes) -> Dict[str, str]:
+    """Deserialize a user object read from S3, either format version"""
+    if body[:1] == _PAYLOAD_MSGPACK_V1:
+        return msgpack.unpackb(body[1:], raw=False)
+    return orjson.loads(body)
+
+
+def _bump_generation(file_name: str) -> None:
+    """Stamp a key as written, must hold `_s3_cache_lock`"""
+    global _s3_seq
+    _s3_seq += 1
+    _s3_last_write[file_name] = _s3_seq
+
+
+def _read_generation() -> int:
+    """Return the generation a GET starting now must not be superseded by"""
+    with _s3_cache_lock:
+        return _s3_seq
+
+
+def _superseded(file_name: str, generation: int) -> bool:
+    """Check if a key was written after a read began, must hold `_s3_cache_lock`"""
+    return _s3_last_write.get(file_name, 0) > generation
+
+
+def _cache_store(file_name: str, etag: Optional[str], data: Dict[str, str]) -> None:
+    """Cache a copy of a user object written to S3"""
+    with _s3_cache_lock:
+        _bump_generation(file_name)
+        _s3_missing.pop(file_name, None)
+        _s3_cache[file_name] = (etag, dict(data), time.monotonic() + s3_cache_fresh)
+
+
+def _cache_fill(file_name: str, generation: int, etag: Optional[str], data: Dict[str, str]) -> None:
+    """Cache a copy of a user object read from S3, unless a write landed since"""
+    with _s3_cache_lock:
+        if _superseded(file_name, generation):
+            return
+        _s3_missing.pop(file_name, None)
+        _s3_cache[file_name] = (etag, dict(data), time.monotonic() + s3_cache_fresh)
+
+
+def _cache_evict(file_name: str) -> None:
+    """Drop a user object from the cache"""
+    with _s3_cache_lock:
+        _bump_generation(file_name)
+        _s3_cache.pop(file_name, None)
+
+
+def _cache_mark_missing(file_name: str, generation: Optional[int] = None) -> None:
+    """Record that a user object does not exist in S3.
+
+    Args:
+        generation: For a failed read, the generation it started at; None
+            for a delete
+    """
+    with _s3_cache_lock:
+        if generation is None:
+            _bump_generation(file_name)
+        elif _superseded(file_name, generation):
+            return
+        _s3_cache.pop(file_name, None)
+        _s3_missing[file_name] = True
+
+
+def _cached_read(file_name: str) -> Tuple[Optional[Dict[str, str]], Optional[Tuple[Any, ...]], int]:
+    """Serve a read from the pending writes or the cache.
+
+    Returns:
+        Tuple: The data if no GET is needed, else None, the stale cache entry
+        to revalidate, if any, and the generation the GET starts at
+    """
+    pending = _pending_write(file_name)
+    if pending is not None:
+        return pending, None, 0
+    with _s3_cache_lock:
+        if file_name in _s3_missing:
+            return {}, None, 0
+        cached = _s3_cache.get(file_name)
+        generation = _s3_seq
+    if cached is not None and cached[2] > time.monotonic():
+        return dict(cached[1]), None, generation
+    return None, cached, generation
+
+
+def _get_request(bucket: str, file_name: str, cached: Optional[Tuple[Any, ...]]) -> Dict[str, str]:
+    """Build get_object arguments, conditional on the cached ETag"""
+    request = {'Bucket': bucket, 'Key': file_name}
+    if cached is not None and cached[0]:
+        request['IfNoneMatch'] = cached[0]
+    return request
+
+
+def _read_failed(
+        file_name: str,
+        cached: Optional[Tuple[Any, ...]],
+        generation: int,
+        error: ClientError) -> Dict[str, str]:
+    """Resolve a failed GET: not modified, missing, or a real error"""
+    code = error.response.get('Error', {}).get('Code')
+    if cached is not None and code == '304':
+        _cache_fill(file_name, generation, cached[0], cached[1])
+        return dict(cached[1])
+    if code in _S3_MISSING_CODES:
+        _cache_mark_missing(file_name, generation)
+    else:
+        _cache_evict(file_name)
+    logger.error(f"Error reading from S3: {str(error)}")
+    return {}
+
+
+def _read_succeeded(file_name: str, generation: int, etag: Optional[str], body: bytes) -> Dict[str, str]:
+    """Decode a fetched body and cache it"""
+    try:
+        data = _decode_payload(body)
+    except ValueError as e:
+        _cache_evict(file_name)
+        logger.error(f"Error decoding S3 object {file_name}: {str(e)}")
+        return {}
+    _cache_fill(file_name, generation, etag, data)
+    return data
+
+
+# Pending writes: file_name -> (bucket, data, deadline). Successive writes to
+# the same object within the flush interval collapse into a single PUT.
+_dirty: Dict[str, Tuple[str, Dict[str, str], float]] = {}
+_dirty_lock = threading.Lock()
+# Serializes PUTs and deletes so an older write can never land after a newer one
+_flush_lock = threading.Lock()
+_flush_wakeup = threading.Event()
+_flusher: Optional[threading.Thread] = None
+
+
+def _put_object(bucket: str, file_name: str, data: Dict[str, str]) -> bool:
+    """PUT a user object and refresh its cache entry
+
+    Returns:
+        bool: False if the write did not reach S3
+    """
+    try:
+        response = _get_s3().put_object(
+            Bucket=bucket,
+            Key=file_name,
+            Body=_encode_payload(data),
+            ContentType=_PAYLOAD_CONTENT_TYPE
+        )
+    except Exception as e:
+        # Not only ClientError: connection errors and timeouts land here too
+        _cache_evict(file_name)
+        logger.error(f"Error writing to S3: {str(e)}")
+        return False
+    with _dirty_lock:
+        # A newer write may have been queued while this one was in flight
+        if file_name not in _dirty:
+            _cache_store(file_name, response.get('ETag'), data)
+    return True
+
+
+def _flush_writes(force: bool = False) -> None:
+    """PUT every pending write whose deadline has passed, or all of them.
+    Failed writes are queued again unless a newer one has replaced them."""
+    with _flush_lock:
+        now = time.monotonic()
+        with _dirty_lock:
+            due = [
+                (file_name, bucket, data)
+                for file_name, (bucket, data, deadline) in _dirty.items()
+                if force or deadline <= now or len(_dirty) > s3_flush_max
+            ]
+            for file_name, _, _ in due:
+                del _dirty[file_name]
+        failed = [
+            (file_name, bucket, data)
+            for file_name, bucket, data in due
+            if not _put_object(bucket, file_name, data)
+        ]
+        if failed:
+            retry_at = time.monotonic() + s3_flush_interval_ms / 1000
+            with _dirty_lock:
+                for file_name, bucket, data in failed:
+                    _dirty.setdefault(file_name, (bucket, data, retry_at))
+
+
+def _flusher_loop() -> None:
+    """Background thread draining the pending writes"""
+    while True:
+        _flush_wakeup.wait(s3_flush_interval_ms / 1000)
+        _flush_wakeup.clear()
+        try:
+            _flush_writes()
+        except Exception as e:
+            logger.error(f"[FLUSH] Error flushing pending writes: {str(e)}", exc_info=True)
+
+
+def _queue_write(bucket: str, file_name: str, data: Dict[str, str]) -> bool:
+    """Buffer a write for the flusher thread.
+
+    Returns:
+        bool: False if coalescing is disabled and the caller must PUT itself
+    """
+    global _flusher
+    if s3_flush_interval_ms <= 0:
+        return False
+    with _dirty_lock:
+        pending = _dirty.get(file_name)
+        deadline = pending[2] if pending else time.monotonic() + s3_flush_interval_ms / 1000
+        _dirty[file_name] = (bucket, dict(data), deadline)
+        _cache_store(file_name, None, data)
+        if _flusher is None or not _flusher.is_alive():
+            _flusher = threading.Thread(target=_flusher_loop, name='s3-flusher', daemon=True)
+            _flusher.start()
+        if len(_dirty) > s3_flush_max:
+            _flush_wakeup.set()
+    return True
+
+
+def _pending_write(file_name: str) -> Optional[Dict[str, str]]:
+    """Return a copy of the buffered write for an object, if any"""
+    with _dirty_lock:
+        pending = _dirty.get(file_name)
+    return dict(pending[1]) if pending else None
+
+
+def _delete_object(bucket: str, file_name: str) -> None:
+    """DELETE a user object, then drop its buffered write and mark it missing.
+
+    Holds `_flush_lock` throughout, so no PUT is in flight or starts during
+    the delete, and a failed delete leaves the buffered write queued.
+
+    Raises:
+        ClientError: If the delete fails
+    """
+    with _flush_lock:
+        _get_s3().delete_object(Bucket=bucket, Key=file_name)
+        with _dirty_lock:
+            _dirty.pop(file_name, None)
+        _cache_mark_missing(file_name)
+
+
+atexit.register(_flush_writes, True)
+
+
+# Successful verifications, keyed by a keyed BLAKE2b tag over
+# (uid, stored hash, user string). Binding the stored hash means a recovered
+# or re-stored account never matches an older entry.
+_verified: TTLCache = TTLCache(maxsize=10_000, ttl=verify_cache_ttl)
+_verified_lock = threading.Lock()
+_VERIFY_TAG_KEY = secrets.token_bytes(32)
+
+
+def _verification_tag(user_id: str, user_hash: str, user_string: str) -> bytes:
+    """Derive the cache tag for a verification attempt"""
+    return hashlib.blake2b(
+        b'\0'.join((user_id.encode('utf-8'), user_hash.encode('utf-8'), user_string.encode('utf-8'))),
+        key=_VERIFY_TAG_KEY,
+        digest_size=16
+    ).digest()
+
+
+def _is_verified(tag: bytes) -> bool:
+    """Check whether a tag was verified recently"""
+    with _verified_lock:
+        return tag in _verified
+
+
+def _mark_verified(tag: bytes) -> None:
+    """Remember a successful verification"""
+    if verify_cache_ttl <= 0:
+        return
+    with _verified_lock:
+        _verified[tag] = True
+
+
+# An Argon2 check still to run: (uid, cache tag, stored hash, serialized string)
+_VerifyJob = Tuple[str, bytes, str, str]
+
+
+def _user_db_view(user_id: str, data: Dict[str, str]) -> Union[str, Dict[str, str]]:
+    """Return a user record read for display, or the message for its absence"""
+    if not data:
+        logger.error(f"[DISPLAY] No database found for UID: {user_id}")
+        return f"No database found for UID: {user_id}"
+    logger.info(f"[DISPLAY] Database contents retrieved for UID: {user_id}")
+    return data
+
+
+def _verification_job(
+        user_id: str,
+        user_string: str,
+        user_data: Union[str, Dict[str, str]]) -> Tuple[Optional[str], Optional[_VerifyJob]]:
+    """Decide a verification from the stored record, short of running Argon2.
+
+    Returns:
+        Tuple: The final message and None if no Argon2 check is needed,
+        else None and the job to run
+    """
+    if not isinstance(user_data, dict):
+        logger.error(f"[VERIF] {user_data}")
+        return user_data, None
+
+    user_hash = user_data.get("hash_string")
+    if user_hash is None:
+        return "User hash not found in the database.", None
+
+    tag = _verification_tag(user_id, user_hash, user_string)
+    if _is_verified(tag):
+        logger.info(f"[VERIF] User verification successful for UID: {user_id} (cached).")
+        return "Successful", None
+    return None, (user_id, tag, user_hash, user_string)
+
+
+def _verification_result(user_id: str, tag: bytes, check_validity: bool) -> str:
+    """Word the outcome of an Argon2 check, remembering a success"""
+    if check_validity:
+        _mark_verified(tag)
+        logger.info(f"[VERIF] User verification successful for UID: {user_id}.")
+        return "Successful"
+    logger.error(f"[VERIF] User string does not match the stored hash for UID: {user_id}.")
+    return "User string does not match the stored hash."
+
+
+def _verification_error(user_id: Optional[str], error: Exception) -> str:
+    """Word a verification that could not complete"""
+    logger.error(f"[VERIF] Error during verification for UID: {user_id}. Error: {str(error)}")
+    return f"Error during verification: {str(error)}"
+
+
 class UserDBManager:
     """Main DB Manager for IRs.
 
@@ -42,30 +543,29 @@ class UserDBManager:
     """
     
     def db_file_exists(self) -> bool:
-        """Check if a DBM file already exists with the given file path and name."""
-        try:
-            self.s3_client.head_object(Bucket=self.bucket_name, Key=self.__file_name)
-            return True
-        except ClientError:
-            return False
+        """Check if a DBM file already exists with the given file path and name.
+        Uses a GET through the object cache rather than a HEAD, so the read
+        that follows is served from memory."""
+        return bool(self._read_from_s3())
 
     def __init__(self, uid: Optional[str] = None, accept_init: bool = True) -> None:
         """Initialize the user storage instance
         with a unique identifier attached to file name."""
         self.__get_path = os.path.expanduser(get_path) if get_path else ''
         self.__unique_identifier = uid if uid else str(uuid.uuid4()) #Except for storing strings, always pass in the uid
-        self.__file_name = f"user_db_{self.__unique_identifier}"
-        self.s3_client = boto3.client('s3')
-        self.bucket_name = os.getenv('S3_BUCKET_NAME')
-
-        if not self.db_file_exists():
-            if not accept_init:
-                logger.info(f"[INIT] Initialization not accepted for {self.get_file_name}")
-                raise ValueError("Initialization not accepted")
-            self.initialize_db()
-            logger.info(f"[INIT] UserDBManager instance initialized for {self.get_file_name}.")
-        else:
-            logger.info(f"[INIT] UserDBManager instance already exists for {self.get_file_name}, skipping initialisation.")
+        self.__file_name = _file_name_for(self.__unique_identifier)
+        self.s3_client = _get_s3()
+        self.bucket_name = os.getenv('S3_BUCKET_NAME', '')
+
+        if accept_init:
+            # Create-if-absent in one round-trip instead of HEAD followed by PUT
+            if self.initialize_db():
+                logger.info(f"[INIT] UserDBManager instance initialized for {self.get_file_name}.")
+                return
+        elif not self.db_file_exists():
+            logger.info(f"[INIT] Initialization not accepted for {self.get_file_name}")
+            raise ValueError("Initialization not accepted")
+        logger.info(f"[INIT] UserDBManager instance already exists for {self.get_file_name}, skipping initialisation.")
 
     @property
     def get_file_path(self) -> Union[str, os.PathLike]:
@@ -82,10 +582,17 @@ class UserDBManager:
         """Retrieve store id"""
         return self.__unique_identifier
     
-    def initialize_db(self, accept_init: bool = True) -> None:
+    def initialize_db(self, accept_init: bool = True) -> bool:
         """Initialize the user-specific database if it doesn't exist.
-        Ensure the directory exists or create it
-        Creates an empty file named 'user_db<uid>' inside the directory
+        Conditionally creates an empty object named 'user_db<uid>' in the bucket,
+        an existing object is left untouched
+
+        Raises:
+            ClientError: If S3 rejects the create for any reason other than
+            the object already existing
+
+        Returns:
+            bool: True if the object was created, False if it already existed
         """
         
         initial_data = {
@@ -95,27 +602,61 @@ class UserDBManager:
             'created_on': ''
         }
 
-        self._write_to_s3(initial_data)
+        try:
+            response = self.s3_client.put_object(
+                Bucket=self.bucket_name,
+                Key=self.__file_name,
+                Body=_encode_payload(initial_data),
+                ContentType=_PAYLOAD_CONTENT_TYPE,
+                IfNoneMatch='*'
+            )
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('PreconditionFailed', 'ConditionalRequestConflict'):
+                with _s3_cache_lock:
+                    _s3_missing.pop(self.__file_name, None)
+                return False
+            logger.error(f"Error writing to S3: {str(e)}")
+            raise
+        _cache_store(self.__file_name, response.get('ETag'), initial_data)
         logger.info(f"[INIT] UserDBManager instance initialised for {self.get_file_name}.")
+        return True
 
-    def _read_from_s3(self) -> Dict[str, str]:
+    def _read_from_s3(self, file_name: Optional[str] = None) -> Dict[str, str]:
+        file_name = file_name or self.__file_name
+        data, cached, generation = _cached_read(file_name)
+        if data is not None:
+            return data
         try:
-            response = self.s3_client.get_object(Bucket=self.bucket_name, Key=self.__file_name)
-            content = response['Body'].read().decode('utf-8')
-            return json.loads(content)
+            response = self.s3_client.get_object(**_get_request(self.bucket_name, file_name, cached))
         except ClientError as e:
-            logger.error(f"Error reading from S3: {str(e)}")
-            return {}
+            return _read_failed(file_name, cached, generation, e)
 
-    def _write_to_s3(self, data: Dict[str, str]) -> None:
+        # Hand the connection back to the pool even if reading fails
+        body = response['Body']
         try:
-            self.s3_client.put_object(
-                Bucket=self.bucket_name,
-                Key=self.__file_name,
-                Body=json.dumps(data).encode('utf-8')
-            )
+            raw = body.read()
+        finally:
+            body.close()
+        return _read_succeeded(file_name, generation, response.get('ETag'), raw)
+
+    async def _read_from_s3_async(self, file_name: str) -> Dict[str, str]:
+        """Async counterpart of `_read_from_s3` sharing the same cache"""
+        data, cached, generation = _cached_read(file_name)
+        if data is not None:
+            return data
+        s3_client = await _get_aio_s3()
+        try:
+            response = await s3_client.get_object(**_get_request(self.bucket_name, file_name, cached))
         except ClientError as e:
-            logger.error(f"Error writing to S3: {str(e)}")
+            return _read_failed(file_name, cached, generation, e)
+
+        async with response['Body'] as body:
+            raw = await body.read()
+        return _read_succeeded(file_name, generation, response.get('ETag'), raw)
+
+    def _write_to_s3(self, data: Dict[str, str]) -> None:
+        if not _queue_write(self.bucket_name, self.__file_name, data):
+            _put_object(self.bucket_name, self.__file_name, data)
 
     def serialize_data(
             self,
@@ -142,18 +683,19 @@ class UserDBManager:
         Returns:
             Optional[Union[str, bytes]]: The data associated with the key, or None
         """
-        file_name = f"user_db_{uid}"
-        file_path = os.path.join(self.__get_path, file_name)
-        if os.path.exists(file_path):
+        file_name = _file_name_for(uid)
+        file_path = _path_for(self.__get_path, uid)
+        try:
             with dbm.open(file_path, 'r') as individual_store:
                 user_data_bytes = individual_store.get(key.encode('utf-8'))
-                if user_data_bytes is not None:
-                    logger.info(f"[FETCH] Data fetched from file: {file_name} ")
-                    return user_data_bytes.decode('utf-8')
-                logger.warning(f'[FETCH] Associated key not found in file: {file_name}')
-                return f"Associated key not found"
-        logger.error("[FETCH] System Error while key lookup")
-        return f'System Error while fetching'
+        except dbm.error:
+            logger.error("[FETCH] System Error while key lookup")
+            return f'System Error while fetching'
+        if user_data_bytes is not None:
+            logger.info(f"[FETCH] Data fetched from file: {file_name} ")
+            return user_data_bytes.decode('utf-8')
+        logger.warning(f'[FETCH] Associated key not found in file: {file_name}')
+        return f"Associated key not found"
 
     def deserialize_data(self, uid: str, key: str) -> Optional[Union[str, bytes]]:
         """Fetch and deserialize user data from the database using a specific key.
@@ -179,18 +721,26 @@ class UserDBManager:
             str: The hashed user string.
         """
         user_string_bytes = user_string.encode('utf-8')
-        passwd_hash = PasswordHasher()
-        hashed_user_string = passwd_hash.hash(user_string_bytes)
+        hashed_user_string = _PH.hash(user_string_bytes)
         return hashed_user_string
 
     def generate_secured_string(self) -> str:
         """Method to generate secured user string 
-        using the global uuid and shortuuid module
+        from 128 random bits, url-safe base64 encoded
         """
-        unique_id = uuid.uuid4()
-        secure_user_string = shortuuid.encode(unique_id)
+        secure_user_string = secrets.token_urlsafe(16)
         return secure_user_string
 
+    def _build_record(self, serialized_data: str, uid: str) -> Dict[str, str]:
+        """Build a complete user record from an already serialized user string,
+        shared by storing and recovering accounts.
+        """
+        return {
+            '_id': uid,
+            'hash_string': self.hash_user_string(serialized_data),
+            'secured_user_string': self.generate_secured_string(),
+            'created_on': datetime.datetime.now().isoformat()
+        }
 
     def store_user_string(self, req: Dict[str, str]) -> Optional[Dict[str, str]]:
         """
@@ -202,25 +752,14 @@ class UserDBManager:
         Returns:
             Optional[Dict[str, str]]: A dictionary containing the user ID if successful, None otherwise.
         """
-        # Validate input
-        if not all(req.values()):
+        # Validate input, bail out before the memory-hard hash
+        request_string = req.get('request_string')
+        if not request_string:
             logger.error("[STORAGE] Empty request received")
             return None
 
-        serialised_data = self.serialize_data(req)
-        user_hash = self.hash_user_string(serialised_data)
-
-        current_datetime = datetime.datetime.now().isoformat()
-        secured_user_string = self.generate_secured_string()
-
-        data = self._read_from_s3()
-        data.update({
-            'hash_string': user_hash,
-            'secured_user_string': secured_user_string,
-            '_id': self.__unique_identifier,
-            'created_on': current_datetime
-        })
-        self._write_to_s3(data)
+        # The object was seeded on init, every field is overwritten so skip the GET
+        self._write_to_s3(self._build_record(json.dumps(request_string), self.__unique_identifier))
 
         if self.__unique_identifier:
             logger.info("[STORAGE] UserID successfully assigned")
@@ -229,51 +768,148 @@ class UserDBManager:
             logger.error("[STORAGE] User ID is None. Unable to assign to uid")
             return None
 
+    def _verification_input(
+            self,
+            req: Dict[str, str]) \
+            -> Tuple[Optional[str], Optional[Tuple[str, str]]]:
+        """Validate a verification request.
+
+        Returns:
+            Tuple: An error message and None, or None and the uid with its
+            serialized user string
+        """
+        user_id = req.get('uid')
+        if not user_id:
+            return "UID not provided in the request.", None
+        try:
+            return None, (user_id, self.serialize_data(req))
+        except KeyError as e:
+            return _verification_error(user_id, e), None
+
+    def _prepare_verification(
+            self,
+            req: Dict[str, str]) \
+            -> Tuple[Optional[str], Optional[_VerifyJob]]:
+        """Validate a request and fetch its record, everything short of Argon2.
+
+        Returns:
+            Tuple: The final message and None if no Argon2 check is needed,
+            else None and the job to run
+        """
+        message, parsed = self._verification_input(req)
+        if parsed is None:
+            return message, None
+        user_id, user_string = parsed
+        return _verification_job(user_id, user_string, self.display_user_db(user_id))
+
     def verify_user(
             self,
             req: Dict[str, str]) \
             -> Optional[str]:
         """ Locate the DB file by UID and verify user credentials.
 
+        A successful verification is remembered for `VERIFY_CACHE_TTL` seconds,
+        repeating it for the same uid, stored hash and string skips Argon2.
+        This trades the per-attempt cost of the hash for a window in which
+        process memory holds proof of a recent success; set the TTL to 0 to
+        always run the full check.
+
         Returns:
             Optional[str]: A success message or None if verification fails.
         """
-        passwd_hash = PasswordHasher()
-        user_id = req.get('uid')
+        message, job = self._prepare_verification(req)
+        if job is None:
+            return message
 
-        if not user_id:
-            return "UID not provided in the request."
+        user_id, tag, user_hash, user_string = job
+        try:
+            check_validity = _verify_hash(user_hash, user_string)
+        except Exception as e:
+            return _verification_error(user_id, e)
+        return _verification_result(user_id, tag, check_validity)
+
+    async def verify_user_async(
+            self,
+            req: Dict[str, str]) \
+            -> Optional[str]:
+        """Async variant of `verify_user`.
+
+        The S3 fetch is awaited so many verifications can be in flight at once,
+        and the Argon2 check runs on a thread pool off the event loop.
+        The S3 client lives as long as the event loop, so run many calls on one
+        long-lived loop; each `asyncio.run` opens and closes a client of its own.
+
+        Returns:
+            Optional[str]: A success message or None if verification fails.
+        """
+        message, parsed = self._verification_input(req)
+        if parsed is None:
+            return message
+
+        user_id, user_string = parsed
+        user_data = _user_db_view(user_id, await self._read_from_s3_async(_file_name_for(user_id)))
+        message, job = _verification_job(user_id, user_string, user_data)
+        if job is None:
+            return message
+
+        _, tag, user_hash, _ = job
+        loop = asyncio.get_running_loop()
+        try:
+            check_validity = await loop.run_in_executor(
+                _ARGON2_POOL, _verify_hash, user_hash, user_string)
+        except Exception as e:
+            return _verification_error(user_id, e)
+        return _verification_result(user_id, tag, check_validity)
 
-        user_string = self.serialize_data(req)
+    def verify_batch(self, reqs: List[Dict[str, str]]) -> List[Optional[str]]:
+        """Verify many users at once.
 
-        # Use display_user_db to get the user data
-        user_data = self.display_user_db(user_id)
+        User data is fetched concurrently, through the object cache, and each
+        Argon2 check is handed to a process pool as soon as its record arrives,
+        so fetches overlap with hashing on every core. A worker that dies fails
+        only the checks the broken pool still held; the next call builds a new pool.
 
-        if isinstance(user_data, dict):
+        Args:
+            reqs (List[Dict[str, str]]): Requests shaped like those of `verify_user`
+
+        Returns:
+            List[Optional[str]]: The `verify_user` message for each request, in order
+        """
+        results: List[Optional[str]] = [None] * len(reqs)
+        checks = {}
+
+        fetches = {
+            _FETCH_POOL.submit(self._prepare_verification, req): index
+            for index, req in enumerate(reqs)
+        }
+        for fetched in as_completed(fetches):
+            index = fetches[fetched]
             try:
-                user_hash = user_data.get("hash_string")
-                if user_hash is None:
-                    return "User hash not found in the database."
-
-                try:
-                    check_validity = passwd_hash.verify(user_hash, user_string)
-                except argon2.exceptions.VerifyMismatchError:
-                    logger.error(f"[VERIF] User string does not match the stored hash for UID: {user_id}.")
-                    return "User string does not match the stored hash."
-
-                if check_validity:
-                    logger.info(f"[VERIF] User verification successful for UID: {user_id}.")
-                    return "Successful"
-                
-                logger.warning(f"[VERIF] User verification failed for UID: {user_id}.")
-                return None
+                message, job = fetched.result()
             except Exception as e:
-                logger.error(f"[VERIF] Error during verification for UID: {user_id}. Error: {str(e)}")
-                return f"Error during verification: {str(e)}"
-        else:
-            # If user_data is a string, it means no database was found
-            logger.error(f"[VERIF] {user_data}")
-            return user_data
+                results[index] = _verification_error(reqs[index].get('uid'), e)
+                continue
+            if job is None:
+                results[index] = message
+                continue
+            user_id, tag, user_hash, user_string = job
+            pool = _get_verify_process_pool()
+            try:
+                checks[index] = (user_id, tag, pool, pool.submit(_verify_hash, user_hash, user_string))
+            except BrokenProcessPool as e:
+                _discard_verify_process_pool(pool)
+                results[index] = _verification_error(user_id, e)
+
+        for index, (user_id, tag, pool, future) in checks.items():
+            try:
+                check_validity = future.result()
+            except Exception as e:
+                if isinstance(e, BrokenProcessPool):
+                    _discard_verify_process_pool(pool)
+                results[index] = _verification_error(user_id, e)
+                continue
+            results[index] = _verification_result(user_id, tag, check_validity)
+        return results
 
     def display_user_db(self, user_id: str) -> Union[str, Dict[str, str]]:
         """Display the contents of the user-specific database
@@ -285,15 +921,7 @@ class UserDBManager:
             Union[str, Dict[str, str]]: A dictionary containing the database contents,
             or an error message if the database is not found.
         """
-        file_name = f"user_db_{user_id}"
-        try:
-            response = self.s3_client.get_object(Bucket=self.bucket_name, Key=file_name)
-            content = response['Body'].read().decode('utf-8')
-            logger.info(f"[DISPLAY] Database contents retrieved for UID: {user_id}")
-            return json.loads(content)
-        except ClientError:
-            logger.error(f"[DISPLAY] No database found for UID: {user_id}")
-            return f"No database found for UID: {user_id}"
+        return _user_db_view(user_id, self._read_from_s3(_file_name_for(user_id)))
 
     def check_sus_integrity(self, req: Dict[str, str]) -> str:
         """Check secured user strings integrity before restoring dbm
@@ -311,8 +939,6 @@ class UserDBManager:
         if not get_user_id and not get_secured_user_string:
             raise TypeError("Invalid key passed")
         
-        file_name = f"user_db_{get_user_id}"
-        
         try:
             data = self._read_from_s3()
             if not data:
@@ -324,7 +950,9 @@ class UserDBManager:
                 logger.warning(f"[RESTORE] Secured user string not found for user:{get_user_id}")
                 return "User string not found in the database."
             
-            if stored_secured_user_string == get_secured_user_string:
+            if hmac.compare_digest(
+                    stored_secured_user_string.encode('utf-8'),
+                    (get_secured_user_string or '').encode('utf-8')):
                 logger.info(f"[RESTORE] Integrity check passed for user:{get_user_id}")
                 return "Success"
             else:
@@ -351,33 +979,14 @@ class UserDBManager:
             logger.error("[RECOVER] Missing '_id' or 'user_string' in request")
             return None
 
-        file_name = f"user_db_{get_uid}"
-        
         try:
-            data = self._read_from_s3()
-            if not data:
-                logger.error(f"[RECOVER] DBM not found for user: {get_uid}")
-                return None
-
-            serialized_data = self.serialize_data({'request_string': user_string})
-            user_hash = self.hash_user_string(serialized_data)
-            
-            current_datetime = datetime.datetime.now().isoformat()
-            secured_user_string = self.generate_secured_string()
-
-            data.update({
-                'hash_string': user_hash,
-                'secured_user_string': secured_user_string,
-                '_id': get_uid,
-                'created_on': current_datetime
-            })
-            
-            self._write_to_s3(data)
+            record = self._build_record(self.serialize_data({'request_string': user_string}), get_uid)
+            self._write_to_s3(record)
 
             logger.info(f"[RECOVER] Account recovered successfully for user: {get_uid}")
             return {
                 "id": get_uid,
-                "sus": secured_user_string
+                "sus": record['secured_user_string']
             }
         except Exception as e:
             logger.error(f"[RECOVER] Error recovering account for user: {get_uid}. Error: {str(e)}")
@@ -401,7 +1010,7 @@ class UserDBManager:
         if not user_id or not secured_user_string:
             raise KeyError('Error parsing user input')
         
-        file_name = f"user_db_{user_id}"
+        file_name = _file_name_for(user_id)
         
         try:
             data = self._read_from_s3()
@@ -413,12 +1022,12 @@ class UserDBManager:
             if db_secured is None:
                 logger.error(f"[CLOSE ACCOUNT] Account does not exist for UID: {user_id}")
                 return 'User not found'
-            if db_secured != secured_user_string:
+            if not hmac.compare_digest(db_secured.encode('utf-8'), secured_user_string.encode('utf-8')):
                 logger.warning(f"[CLOSE ACCOUNT] Provided Secured User String does not match for UID: {user_id}")
                 return 'Provided Secured User String does not match for UID'
             
-            self.s3_client.delete_object(Bucket=self.bucket_name, Key=file_name)
-            
+            _delete_object(self.bucket_name, file_name)
+
             logger.info(f"[CLOSE ACCOUNT] Account deleted successfully for UID: {user_id}")
             return 'Success'
         except ClientError as e:
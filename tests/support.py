@@ -0,0 +1,29 @@
+"""Shared fixtures for the test cases"""
+import json
+import unittest
+from typing import Any, Dict
+from unittest import mock
+
+SECURED_USER_STRING = 'mikye12345678iuiujfkk'
+CREATED_ON = '2024-01-01T00:00:00'
+
+
+def make_record(hasher: Any, uid: str, request_string: str) -> Dict[str, str]:
+    """Build a stored user record whose hash matches `request_string`"""
+    return {
+        '_id': uid,
+        'hash_string': hasher.hash(json.dumps(request_string).encode('utf-8')),
+        'secured_user_string': SECURED_USER_STRING,
+        'created_on': CREATED_ON
+    }
+
+
+class PatchingTestCase(unittest.TestCase):
+    """TestCase whose patches are undone after each test"""
+
+    def patch(self, target: Any, attribute: str, *args: Any, **kwargs: Any) -> Any:
+        """Patch an attribute for the rest of the test and return the patched value"""
+        patcher = mock.patch.object(target, attribute, *args, **kwargs)
+        patched = patcher.start()
+        self.addCleanup(patcher.stop)
+        return patched
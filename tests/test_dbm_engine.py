@@ -0,0 +1,65 @@
+"""Test cases for the LMDB-backed local UserDBManager"""
+import dbm.dumb
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from src import dbm_engine
+from src.dbm_engine import UserDBManager
+from tests.support import SECURED_USER_STRING, PatchingTestCase, make_record
+
+
+class TestLocalUserStore(PatchingTestCase):
+    """Test cases for the local store engine, on a temporary directory"""
+
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.base = tmp_dir.name
+        self.patch(dbm_engine, 'get_path', self.base)
+
+    def test_store_verify_close(self):
+        """Test a stored string verifies and the account can be closed"""
+        db_manager = UserDBManager()
+        uid = db_manager.store_user_string({'request_string': 'secret'})['id']
+
+        self.assertEqual(db_manager.verify_user({'uid': uid, 'request_string': 'secret'}), "Successful")
+        self.assertEqual(
+            db_manager.verify_user({'uid': uid, 'request_string': 'wrong'}),
+            "User string does not match the stored hash."
+        )
+
+        sus = db_manager.display_user_db(uid)['secured_user_string']
+        self.assertEqual(db_manager.close_account({'uid': uid, 'sus': sus}), 'Success')
+        self.assertFalse(os.path.exists(db_manager.get_file_path))
+
+    def write_legacy_store(self, uid):
+        """Lay out a store the way the dbm engine wrote them"""
+        file_path = os.path.join(self.base, f"user_db_{uid}")
+        with open(file_path, 'w', encoding="utf-8"):
+            pass
+        with dbm.dumb.open(file_path, 'n') as legacy_store:
+            for key, value in make_record(dbm_engine._PH, uid, 'secret').items():
+                legacy_store[key] = value.encode('utf-8')
+        return file_path
+
+    def test_migrates_legacy_dbm_store(self):
+        """Test a store written by the dbm engine is converted on first open"""
+        uid = '86dd526f-a86f-44f2-aa28-b1dc6f99ee30'
+        file_path = self.write_legacy_store(uid)
+
+        db_manager = UserDBManager(uid)
+        self.assertEqual(db_manager.verify_user({'uid': uid, 'request_string': 'secret'}), "Successful")
+        self.assertEqual(db_manager.display_user_db(uid)['secured_user_string'], SECURED_USER_STRING)
+        self.assertFalse(os.path.exists(f"{file_path}.dat"))
+        self.assertEqual(dbm.whichdb(file_path), '')
+
+    def test_concurrent_first_opens_migrate_once(self):
+        """Test threads opening the same legacy store all see the migrated records"""
+        uid = '86dd526f-a86f-44f2-aa28-b1dc6f99ee31'
+        self.write_legacy_store(uid)
+        db_manager = UserDBManager(uid)
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            views = list(pool.map(db_manager.display_user_db, [uid] * 8))
+        for view in views:
+            self.assertEqual(view['secured_user_string'], SECURED_USER_STRING)
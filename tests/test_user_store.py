@@ -1,7 +1,19 @@
 """Test cases for UserDBManager"""
+import asyncio
+import dbm.dumb
+import hashlib
+import io
+import json
+import tempfile
 import unittest
 import os
-from src.user_db_manager import UserDBManager
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from unittest import mock
+from botocore.exceptions import ClientError
+from src import user_db_manager
+from src.user_db_manager import UserDBManager, _decode_payload, _encode_payload
+from tests.support import SECURED_USER_STRING, PatchingTestCase, make_record
 
 
 class TestUserDBManager(unittest.TestCase):
@@ -70,4 +82,472 @@ class TestUserDBManager(unittest.TestCase):
         }
         uid = req.get('uid')
         x = UserDBManager(uid).check_sus_integrity(req)
-        self.assertTrue(x == 'Error, Integrity check failed')
\ No newline at end of file
+        self.assertTrue(x == 'Error, Integrity check failed')
+
+
+class TestPayload(unittest.TestCase):
+    """Test cases for the S3 payload format"""
+
+    data = {
+        '_id': '86dd526f-a86f-44f2-aa28-b1dc6f99ee30',
+        'hash_string': '$argon2id$v=19$m=65536,t=3,p=4$c2FsdA$aGFzaA',
+        'secured_user_string': 'mikye12345678iuiujfkk',
+        'created_on': '2024-01-01T00:00:00'
+    }
+
+    def test_payload_round_trip(self):
+        """Test encoded payloads are versioned and decode back"""
+        body = _encode_payload(self.data)
+        self.assertTrue(body.startswith(b'\x01'))
+        self.assertEqual(_decode_payload(body), self.data)
+
+    def test_decode_legacy_json(self):
+        """Test objects stored as JSON before the msgpack switch still decode"""
+        body = json.dumps(self.data).encode('utf-8')
+        self.assertEqual(_decode_payload(body), self.data)
+
+
+class StubAioBody:
+    """aiobotocore-style streaming body over bytes"""
+
+    def __init__(self, body):
+        self.body = body
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.body.close()
+
+    async def read(self):
+        return self.body.read()
+
+
+class StubAioClient:
+    """aioboto3-style client answering GETs through a synchronous stub"""
+
+    def __init__(self, get_object):
+        self.sync_get_object = get_object
+        self.closed = False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.closed = True
+
+    async def get_object(self, **kwargs):
+        response = dict(self.sync_get_object(**kwargs))
+        response['Body'] = StubAioBody(response['Body'])
+        return response
+
+
+class StubbedS3TestCase(PatchingTestCase):
+    """Base for tests against a stubbed S3 client.
+
+    Objects put through the stub land in `self.objects` and are served back by
+    `get_object`, also to the async clients opened into `self.aio_clients`.
+    The module-level caches and queues are emptied after each test.
+    """
+
+    def setUp(self):
+        self.objects = {}
+        self.client = mock.MagicMock()
+        self.client.get_object.side_effect = self.get_object
+        self.client.put_object.side_effect = self.put_object
+        self.patch(user_db_manager, '_get_s3', return_value=self.client)
+        self.aio_clients = []
+        self.patch(user_db_manager._AIO_SESSION, 'client', side_effect=self.open_aio_client)
+        self.addCleanup(self.clear_module_state)
+
+    def open_aio_client(self, *args, **kwargs):
+        client = StubAioClient(self.get_object)
+        self.aio_clients.append(client)
+        return client
+
+    @staticmethod
+    def etag(body):
+        return f'"{hashlib.md5(body).hexdigest()}"'
+
+    def get_object(self, **kwargs):
+        record = self.objects.get(kwargs['Key'])
+        if record is None:
+            raise ClientError({'Error': {'Code': 'NoSuchKey'}}, 'GetObject')
+        body = _encode_payload(record)
+        if kwargs.get('IfNoneMatch') == self.etag(body):
+            raise ClientError({'Error': {'Code': '304'}}, 'GetObject')
+        return {'Body': io.BytesIO(body), 'ETag': self.etag(body)}
+
+    def put_object(self, **kwargs):
+        if kwargs.get('IfNoneMatch') == '*' and kwargs['Key'] in self.objects:
+            raise ClientError({'Error': {'Code': 'PreconditionFailed'}}, 'PutObject')
+        self.objects[kwargs['Key']] = _decode_payload(kwargs['Body'])
+        return {'ETag': self.etag(kwargs['Body'])}
+
+    def put_bodies(self):
+        return [
+            (call.kwargs['Key'], _decode_payload(call.kwargs['Body']))
+            for call in self.client.put_object.call_args_list
+        ]
+
+    @staticmethod
+    def clear_module_state():
+        with user_db_manager._dirty_lock:
+            user_db_manager._dirty.clear()
+        with user_db_manager._s3_cache_lock:
+            user_db_manager._s3_cache.clear()
+            user_db_manager._s3_missing.clear()
+        with user_db_manager._verified_lock:
+            user_db_manager._verified.clear()
+
+
+class TestObjectCache(StubbedS3TestCase):
+    """Test cases for the in-process S3 object cache"""
+
+    file_name = 'user_db_cache-test'
+
+    def test_fill_served_from_cache(self):
+        """Test a read fill is served without another GET"""
+        generation = user_db_manager._read_generation()
+        user_db_manager._cache_fill(self.file_name, generation, '"etag"', {'_id': 'a'})
+        data, cached, _ = user_db_manager._cached_read(self.file_name)
+        self.assertEqual(data, {'_id': 'a'})
+        self.assertIsNone(cached)
+
+    def test_fill_after_write_is_dropped(self):
+        """Test a GET that started before a write does not cache the old record"""
+        generation = user_db_manager._read_generation()
+        user_db_manager._cache_store(self.file_name, '"new"', {'_id': 'new'})
+        user_db_manager._cache_fill(self.file_name, generation, '"old"', {'_id': 'old'})
+        data, _, _ = user_db_manager._cached_read(self.file_name)
+        self.assertEqual(data, {'_id': 'new'})
+
+    def read_through_manager(self):
+        """Store an object, read it once to fill the cache, and forget the GET"""
+        uid = '5c0ffee0-0000-4000-8000-000000000003'
+        record = make_record(user_db_manager._PH, uid, 'secret')
+        self.objects[f"user_db_{uid}"] = record
+        db_manager = UserDBManager(uid, accept_init=False)
+        self.client.get_object.reset_mock()
+        return db_manager, record
+
+    def test_fresh_hit_skips_get(self):
+        """Test a fresh cache entry is served without calling S3"""
+        db_manager, record = self.read_through_manager()
+        self.assertEqual(db_manager.display_user_db(record['_id']), record)
+        self.client.get_object.assert_not_called()
+
+    def test_stale_entry_revalidated_by_etag(self):
+        """Test a stale entry sends If-None-Match and a 304 serves the cached body"""
+        self.patch(user_db_manager, 's3_cache_fresh', -1)
+        db_manager, record = self.read_through_manager()
+        etag = self.etag(_encode_payload(record))
+
+        self.assertEqual(db_manager.display_user_db(record['_id']), record)
+        self.client.get_object.assert_called_once_with(
+            Bucket=db_manager.bucket_name, Key=db_manager.get_file_name, IfNoneMatch=etag)
+
+        # A changed object is fetched in full despite the cached entry
+        changed = make_record(user_db_manager._PH, record['_id'], 'rotated')
+        self.objects[db_manager.get_file_name] = changed
+        self.assertEqual(db_manager.display_user_db(record['_id']), changed)
+
+    def test_fill_after_delete_does_not_resurrect(self):
+        """Test a GET that started before a delete keeps the object missing"""
+        generation = user_db_manager._read_generation()
+        user_db_manager._cache_mark_missing(self.file_name)
+        user_db_manager._cache_fill(self.file_name, generation, '"old"', {'_id': 'old'})
+        data, _, _ = user_db_manager._cached_read(self.file_name)
+        self.assertEqual(data, {})
+
+
+class TestWriteCoalescer(StubbedS3TestCase):
+    """Test cases for the buffered S3 writes"""
+
+    bucket = 'test-bucket'
+
+    def setUp(self):
+        super().setUp()
+        # Long enough that only the test itself flushes
+        self.patch(user_db_manager, 's3_flush_interval_ms', 60_000)
+
+    def test_writes_flush_in_order_and_coalesce(self):
+        """Test the last write per object wins and objects flush in queue order"""
+        user_db_manager._queue_write(self.bucket, 'user_db_a', {'v': '1'})
+        user_db_manager._queue_write(self.bucket, 'user_db_b', {'v': '1'})
+        user_db_manager._queue_write(self.bucket, 'user_db_a', {'v': '2'})
+        self.assertEqual(user_db_manager._pending_write('user_db_a'), {'v': '2'})
+        self.client.put_object.assert_not_called()
+
+        user_db_manager._flush_writes(force=True)
+        self.assertEqual(
+            self.put_bodies(),
+            [('user_db_a', {'v': '2'}), ('user_db_b', {'v': '1'})]
+        )
+        self.assertIsNone(user_db_manager._pending_write('user_db_a'))
+
+    def test_deleted_object_write_is_not_flushed(self):
+        """Test a write buffered before a delete never reaches S3"""
+        user_db_manager._queue_write(self.bucket, 'user_db_a', {'v': '1'})
+        user_db_manager._delete_object(self.bucket, 'user_db_a')
+        user_db_manager._flush_writes(force=True)
+        self.client.delete_object.assert_called_once_with(Bucket=self.bucket, Key='user_db_a')
+        self.client.put_object.assert_not_called()
+        self.assertEqual(user_db_manager._cached_read('user_db_a')[0], {})
+
+    def test_failed_close_keeps_buffered_write(self):
+        """Test a failed delete in close_account leaves the newest record queued"""
+        uid = '5c0ffee0-0000-4000-8000-000000000014'
+        self.objects[f"user_db_{uid}"] = make_record(user_db_manager._PH, uid, 'old')
+        db_manager = UserDBManager(uid, accept_init=False)
+        recovered = make_record(user_db_manager._PH, uid, 'new')
+        db_manager._write_to_s3(recovered)
+
+        self.client.delete_object.side_effect = ClientError({'Error': {'Code': 'InternalError'}}, 'DeleteObject')
+        result = db_manager.close_account({'uid': uid, 'sus': SECURED_USER_STRING})
+        self.assertEqual(result, 'Error deleting account')
+        self.assertEqual(user_db_manager._pending_write(db_manager.get_file_name), recovered)
+        self.assertEqual(db_manager.display_user_db(uid), recovered)
+
+    def test_failed_write_is_queued_again(self):
+        """Test a PUT that fails with any error is retried on the next flush"""
+        self.client.put_object.side_effect = [ConnectionError('reset'), {'ETag': '"etag"'}]
+        user_db_manager._queue_write(self.bucket, 'user_db_a', {'v': '1'})
+
+        user_db_manager._flush_writes(force=True)
+        self.assertEqual(user_db_manager._pending_write('user_db_a'), {'v': '1'})
+
+        user_db_manager._flush_writes(force=True)
+        self.assertEqual(self.put_bodies(), [('user_db_a', {'v': '1'})] * 2)
+        self.assertIsNone(user_db_manager._pending_write('user_db_a'))
+
+    def test_write_through_when_disabled(self):
+        """Test coalescing is skipped when the interval is 0"""
+        with mock.patch.object(user_db_manager, 's3_flush_interval_ms', 0):
+            self.assertFalse(user_db_manager._queue_write(self.bucket, 'user_db_a', {'v': '1'}))
+        self.assertIsNone(user_db_manager._pending_write('user_db_a'))
+
+
+class TestVerificationCache(StubbedS3TestCase):
+    """Test cases for the cache of successful verifications"""
+
+    uid = '5c0ffee0-0000-4000-8000-000000000015'
+
+    def setUp(self):
+        super().setUp()
+        self.objects[f"user_db_{self.uid}"] = make_record(user_db_manager._PH, self.uid, 'secret')
+        self.ph = self.patch(user_db_manager, '_PH', wraps=user_db_manager._PH)
+        self.db_manager = UserDBManager(self.uid, accept_init=False)
+
+    def verify(self, request_string):
+        return self.db_manager.verify_user({'uid': self.uid, 'request_string': request_string})
+
+    def test_repeat_skips_argon2(self):
+        """Test a repeated successful verification is served from the cache"""
+        self.assertEqual(self.verify('secret'), "Successful")
+        self.assertEqual(self.verify('secret'), "Successful")
+        self.assertEqual(self.ph.verify.call_count, 1)
+
+    def test_tag_tied_to_stored_hash(self):
+        """Test a cached success does not survive the stored hash changing"""
+        self.assertEqual(self.verify('secret'), "Successful")
+        self.objects[self.db_manager.get_file_name] = make_record(self.ph, self.uid, 'rotated')
+        user_db_manager._cache_evict(self.db_manager.get_file_name)
+        self.assertEqual(self.verify('secret'), "User string does not match the stored hash.")
+        self.assertEqual(self.ph.verify.call_count, 2)
+
+    def test_ttl_zero_disables(self):
+        """Test VERIFY_CACHE_TTL=0 runs Argon2 every time"""
+        with mock.patch.object(user_db_manager, 'verify_cache_ttl', 0):
+            self.assertEqual(self.verify('secret'), "Successful")
+            self.assertEqual(self.verify('secret'), "Successful")
+        self.assertEqual(self.ph.verify.call_count, 2)
+
+
+class TestVerifyBatch(StubbedS3TestCase):
+    """Test cases for batch verification"""
+
+    uids = (
+        '5c0ffee0-0000-4000-8000-000000000021',
+        '5c0ffee0-0000-4000-8000-000000000022',
+    )
+
+    def setUp(self):
+        super().setUp()
+        for uid in self.uids:
+            # Each user's string is their uid
+            self.objects[f"user_db_{uid}"] = make_record(user_db_manager._PH, uid, uid)
+        worker_pool = ThreadPoolExecutor(max_workers=2)
+        self.addCleanup(worker_pool.shutdown)
+        # Threads stand in for worker processes, see TestVerifyProcessPool for the real ones
+        self.patch(user_db_manager, '_get_verify_process_pool', return_value=worker_pool)
+        self.db_manager = UserDBManager(self.uids[0], accept_init=False)
+
+    def test_results_in_request_order(self):
+        """Test each result lines up with its request, whatever finishes first"""
+        results = self.db_manager.verify_batch([
+            {'uid': self.uids[1], 'request_string': self.uids[1]},
+            {'uid': 'missing', 'request_string': 'x'},
+            {'uid': self.uids[0], 'request_string': 'wrong'},
+            {'request_string': 'x'},
+            {'uid': self.uids[0], 'request_string': self.uids[0]},
+        ])
+        self.assertEqual(results, [
+            "Successful",
+            "No database found for UID: missing",
+            "User string does not match the stored hash.",
+            "UID not provided in the request.",
+            "Successful",
+        ])
+
+    def test_bad_request_does_not_abort_batch(self):
+        """Test a request without request_string fails alone"""
+        results = self.db_manager.verify_batch([
+            {'uid': self.uids[0]},
+            {'uid': self.uids[1], 'request_string': self.uids[1]},
+        ])
+        self.assertTrue(results[0].startswith("Error during verification:"))
+        self.assertEqual(results[1], "Successful")
+
+    def test_empty_batch(self):
+        """Test an empty batch returns no results"""
+        self.assertEqual(self.db_manager.verify_batch([]), [])
+
+
+class TestVerifyProcessPool(StubbedS3TestCase):
+    """Test cases for batch verification on the real forkserver pool"""
+
+    uid = '5c0ffee0-0000-4000-8000-000000000023'
+
+    def setUp(self):
+        super().setUp()
+        self.objects[f"user_db_{self.uid}"] = make_record(user_db_manager._PH, self.uid, 'secret')
+        self.addCleanup(self.shutdown_pool)
+        self.db_manager = UserDBManager(self.uid, accept_init=False)
+
+    @staticmethod
+    def shutdown_pool():
+        with user_db_manager._verify_process_pool_lock:
+            pool, user_db_manager._VERIFY_PROCESS_POOL = user_db_manager._VERIFY_PROCESS_POOL, None
+        if pool is not None:
+            pool.shutdown()
+
+    def verify_batch(self):
+        return self.db_manager.verify_batch([
+            {'uid': self.uid, 'request_string': 'secret'},
+            {'uid': self.uid, 'request_string': 'wrong'},
+        ])
+
+    def test_verify_hash_in_worker(self):
+        """Test _verify_hash runs in a worker process with a real hash"""
+        user_hash = user_db_manager._PH.hash(b'"secret"')
+        pool = user_db_manager._get_verify_process_pool()
+        self.assertTrue(pool.submit(user_db_manager._verify_hash, user_hash, '"secret"').result())
+        self.assertFalse(pool.submit(user_db_manager._verify_hash, user_hash, '"wrong"').result())
+        self.assertEqual(self.verify_batch(), ["Successful", "User string does not match the stored hash."])
+
+    def test_pool_rebuilt_after_worker_dies(self):
+        """Test a dead worker fails its batch only and the next batch gets a new pool"""
+        broken = user_db_manager._get_verify_process_pool()
+        with self.assertRaises(BrokenProcessPool):
+            broken.submit(os._exit, 1).result()
+
+        result, = self.db_manager.verify_batch([{'uid': self.uid, 'request_string': 'secret'}])
+        self.assertTrue(result.startswith("Error during verification:"))
+        self.assertEqual(self.verify_batch(), ["Successful", "User string does not match the stored hash."])
+        self.assertIsNot(user_db_manager._get_verify_process_pool(), broken)
+
+
+class TestVerifyUserAsync(StubbedS3TestCase):
+    """Test cases for async verification"""
+
+    uid = '5c0ffee0-0000-4000-8000-000000000011'
+
+    def setUp(self):
+        super().setUp()
+        self.objects[f"user_db_{self.uid}"] = make_record(user_db_manager._PH, self.uid, 'secret')
+        self.db_manager = UserDBManager(self.uid, accept_init=False)
+        # The sync read on init filled the cache, make the async path fetch
+        user_db_manager._cache_evict(self.db_manager.get_file_name)
+
+    async def verify_many(self, *reqs):
+        return await asyncio.gather(*(self.db_manager.verify_user_async(req) for req in reqs))
+
+    def test_results(self):
+        """Test async verification returns the same messages as verify_user"""
+        results = asyncio.run(self.verify_many(
+            {'uid': self.uid, 'request_string': 'secret'},
+            {'uid': self.uid, 'request_string': 'wrong'},
+            {'uid': 'missing', 'request_string': 'secret'},
+            {'request_string': 'secret'},
+        ))
+        self.assertEqual(results, [
+            "Successful",
+            "User string does not match the stored hash.",
+            "No database found for UID: missing",
+            "UID not provided in the request.",
+        ])
+
+    def test_client_closed_with_loop(self):
+        """Test one client serves a loop and is closed when asyncio.run exits"""
+        asyncio.run(self.verify_many(*[{'uid': self.uid, 'request_string': 'secret'}] * 3))
+        self.assertEqual(len(self.aio_clients), 1)
+        self.assertTrue(self.aio_clients[0].closed)
+        self.assertEqual(len(user_db_manager._aio_s3_clients), 0)
+
+
+class TestFetchUserData(StubbedS3TestCase):
+    """Test cases for key lookups in a local dbm store"""
+
+    uid = '5c0ffee0-0000-4000-8000-000000000013'
+
+    def setUp(self):
+        super().setUp()
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.file_path = os.path.join(tmp_dir.name, f"user_db_{self.uid}")
+        self.patch(user_db_manager, 'get_path', tmp_dir.name)
+        self.objects[f"user_db_{self.uid}"] = make_record(user_db_manager._PH, self.uid, 'secret')
+        self.db_manager = UserDBManager(self.uid, accept_init=False)
+
+    def test_key_found(self):
+        """Test a stored key is returned decoded"""
+        with dbm.dumb.open(self.file_path, 'n') as individual_store:
+            individual_store['created_on'] = b'2024-01-01T00:00:00'
+        self.assertEqual(self.db_manager._fetch_user_data(self.uid, 'created_on'), '2024-01-01T00:00:00')
+        self.assertEqual(self.db_manager._fetch_user_data(self.uid, '_id'), "Associated key not found")
+
+    def test_missing_store(self):
+        """Test a missing store is reported without raising"""
+        self.assertEqual(self.db_manager._fetch_user_data(self.uid, '_id'), 'System Error while fetching')
+
+
+class TestInitializeDb(StubbedS3TestCase):
+    """Test cases for the conditional create on init"""
+
+    uid = '5c0ffee0-0000-4000-8000-000000000006'
+    file_name = f"user_db_{uid}"
+
+    def test_created(self):
+        """Test a new object is created and cached without a GET"""
+        db_manager = UserDBManager(self.uid)
+        self.assertEqual(set(self.objects[self.file_name].values()), {''})
+        self.assertEqual(db_manager.display_user_db(self.uid), self.objects[self.file_name])
+        self.client.get_object.assert_not_called()
+
+    def test_existing_object_left_untouched(self):
+        """Test a 412 keeps the stored record and clears a stale missing mark"""
+        record = make_record(user_db_manager._PH, self.uid, 'secret')
+        self.objects[self.file_name] = record
+        user_db_manager._cache_mark_missing(self.file_name)
+
+        db_manager = UserDBManager(self.uid)
+        self.assertFalse(db_manager.initialize_db())
+        self.assertEqual(self.objects[self.file_name], record)
+        self.assertEqual(db_manager.display_user_db(self.uid), record)
+
+    def test_error_raised(self):
+        """Test a failed create is raised instead of treated as existing"""
+        self.client.put_object.side_effect = ClientError({'Error': {'Code': 'AccessDenied'}}, 'PutObject')
+        with self.assertRaises(ClientError):
+            UserDBManager(self.uid)